@@ -1,6 +1,9 @@
-import geopandas as gpd   # Biblioteca para trabalhar com dados geoespaciais
+import json               # Serialização do mapa em JSON
+
 import numpy as np        # Biblioteca para operações numéricas e vetoriais
 import pandas as pd       # Biblioteca para manipulação de dados em DataFrames
+import pyarrow as pa      # Biblioteca para dados colunares (Apache Arrow)
+import pyarrow.parquet as pq  # Leitura de arquivos Parquet via Arrow
 import pydeck as pdk      # Biblioteca para visualização de mapas interativos
 import shapely            # Biblioteca para manipulação de geometrias espaciais
 import streamlit as st    # Framework para criação de aplicações web interativas
@@ -8,8 +11,12 @@ import streamlit as st    # Framework para criação de aplicações web interat
 from joblib import load   # Utilitário para carregar modelos treinados salvos
 
 # Importa variáveis de configuração (caminhos dos dados e modelo)
-from notebooks.src.config import DADOS_GEO_MEDIAN, DADOS_LIMPOS, MODELO_FINAL
-
+from notebooks.src.config import (
+    COLUNAS_GEO_APP,
+    DADOS_GEO_RENDER,
+    DADOS_LIMPOS,
+    MODELO_FINAL,
+)
 
 @st.cache_data
 def carregar_dados_limpos():
@@ -24,49 +31,27 @@ def carregar_dados_limpos():
 @st.cache_data
 def carregar_dados_geo():
     """
-    Carrega dados geoespaciais, corrige geometrias inválidas e extrai coordenadas dos polígonos.
+    Carrega os dados geoespaciais já preparados para visualização no pydeck.
 
-    Passos:
-    - Lê arquivo parquet com informações geográficas.
-    - Explode MultiPolygons em polígonos individuais.
-    - Corrige geometrias inválidas (buffer(0)).
-    - Orienta polígonos no sentido anti-horário.
-    - Extrai coordenadas dos polígonos para visualização no pydeck.
+    A correção das geometrias e a extração das coordenadas dos polígonos são feitas
+    uma única vez pelo script scripts/build_geo_cache.py, que gera o arquivo lido aqui.
+    A coluna 'geometry_coords' é mantida como lista do Arrow (pd.ArrowDtype), sem
+    materializar arrays aninhados de objetos Python na leitura, e as colunas 'name'
+    e 'ocean_proximity' são convertidas para o tipo categórico.
 
     Retorna:
-        GeoDataFrame processado com coluna 'geometry' contendo coordenadas.
-    """
-    gdf_geo = gpd.read_parquet(DADOS_GEO_MEDIAN)
-
-    # Divide multipolígonos em polígonos individuais
-    gdf_geo = gdf_geo.explode(ignore_index=True)
-
-    # Função para corrigir geometrias inválidas e orientar polígonos
-    def fix_and_orient_geometry(geometry):
-        if not geometry.is_valid:
-            geometry = geometry.buffer(0)  # Corrige geometria inválida
-        if isinstance(
-            geometry, (shapely.geometry.Polygon, shapely.geometry.MultiPolygon)
-        ):
-            geometry = shapely.geometry.polygon.orient(geometry, sign=1.0)
-        return geometry
-
-    # Aplica correção nas geometrias
-    gdf_geo["geometry"] = gdf_geo["geometry"].apply(fix_and_orient_geometry)
-
-    # Função para extrair coordenadas dos polígonos
-    def get_polygon_coordinates(geometry):
-        return (
-            [[[x, y] for x, y in geometry.exterior.coords]]
-            if isinstance(geometry, shapely.geometry.Polygon)
-            else [
-                [[x, y] for x, y in polygon.exterior.coords]
-                for polygon in geometry.geoms
-            ]
-        )
+        DataFrame com os atributos dos condados e a coluna 'geometry_coords'.
+    """
+    tabela = pq.read_table(
+        DADOS_GEO_RENDER, columns=[*COLUNAS_GEO_APP, "geometry_coords"]
+    )
+    gdf_geo = tabela.to_pandas(
+        types_mapper=lambda tipo: pd.ArrowDtype(tipo) if pa.types.is_list(tipo) else None
+    )
 
-    # Aplica extração das coordenadas
-    gdf_geo["geometry"] = gdf_geo["geometry"].apply(get_polygon_coordinates)
+    # Colunas de texto como categóricas: comparações e ordenação usam os códigos
+    gdf_geo["name"] = gdf_geo["name"].astype("category")
+    gdf_geo["ocean_proximity"] = gdf_geo["ocean_proximity"].astype("category")
 
     return gdf_geo
 
@@ -75,22 +60,253 @@ def carregar_dados_geo():
 def carregar_modelo():
     """
     Carrega o modelo de Machine Learning salvo em disco.
+
+    Os arrays NumPy do modelo são mapeados em memória (mmap_mode="r"): o sistema
+    operacional lê do disco apenas as páginas usadas na previsão. Isso exige que o
+    arquivo tenha sido salvo sem compressão (veja MODELO_FINAL em config.py).
+
     Retorna:
         Modelo treinado carregado via joblib.
     """
-    return load(MODELO_FINAL)
+    return load(MODELO_FINAL, mmap_mode="r")
+
+
+@st.cache_resource
+def colunas_modelo():
+    """
+    Obtém as colunas de entrada do modelo, na ordem vista durante o treino.
+    Retorna:
+        Array com os nomes das colunas (feature_names_in_ do modelo).
+    """
+    return carregar_modelo().feature_names_in_
+
+
+@st.cache_resource
+def carregar_atributos_condados():
+    """
+    Organiza os atributos dos condados em arrays NumPy, um por coluna.
+
+    Como os multipolígonos foram explodidos, um mesmo condado pode ocupar várias
+    linhas do DataFrame geográfico; todas têm os mesmos atributos, então mantém-se
+    a primeira. Cada array tem um valor por condado, na mesma ordem.
+
+    Retorna:
+        Tupla com o dicionário {coluna: array de valores} e o dicionário
+        {nome do condado: posição nos arrays}.
+    """
+    df_condados = gdf_geo.drop(columns="geometry_coords").drop_duplicates(
+        subset="name"
+    )
+    atributos = {coluna: df_condados[coluna].to_numpy() for coluna in df_condados}
+    posicoes = {nome: posicao for posicao, nome in enumerate(atributos["name"])}
+    return atributos, posicoes
+
+
+@st.cache_data
+def posicoes_condados():
+    """
+    Mapeia cada condado para as linhas que ele ocupa no DataFrame geográfico.
+
+    Os polígonos de um mesmo condado ficam em linhas consecutivas (resultado do
+    explode), então cada condado corresponde a uma fatia de posições.
+
+    Retorna:
+        Dicionário {nome do condado: slice das posições em gdf_geo}.
+    """
+    # Compara os códigos inteiros da coluna categórica, e não os textos
+    codigos = gdf_geo["name"].cat.codes.to_numpy()
+    nomes = gdf_geo["name"].cat.categories
+    inicios = np.flatnonzero(np.r_[True, codigos[1:] != codigos[:-1]])
+    fins = np.r_[inicios[1:], len(codigos)]
+    return {
+        nomes[codigos[inicio]]: slice(inicio, fim)
+        for inicio, fim in zip(inicios, fins)
+    }
+
+
+@st.cache_resource
+def indice_espacial_condados():
+    """
+    Cria um índice espacial (STRtree) com os polígonos dos condados.
+
+    Os polígonos são reconstruídos diretamente dos offsets da lista do Arrow em
+    'geometry_coords' (linhas -> anéis -> pontos), sem laços em Python. Cada linha
+    vira um multipolígono cujos polígonos são os seus anéis externos.
+
+    Retorna:
+        STRtree com uma geometria por linha do DataFrame geográfico.
+    """
+    linhas = pa.array(gdf_geo["geometry_coords"])
+    aneis = linhas.values
+    pontos = aneis.values
+    coords = pontos.values.to_numpy().reshape(-1, 2)
+    offsets = (
+        aneis.offsets.to_numpy(),      # anel -> pontos
+        np.arange(len(aneis) + 1),     # polígono -> anel (um anel por polígono)
+        linhas.offsets.to_numpy(),     # linha -> polígonos
+    )
+    geometrias = shapely.from_ragged_array(
+        shapely.GeometryType.MULTIPOLYGON, coords, offsets
+    )
+    return shapely.STRtree(geometrias)
+
+
+def localizar_condado(longitude, latitude):
+    """
+    Encontra o condado que contém um ponto, por exemplo um clique no mapa.
+
+    Parâmetros:
+        longitude: longitude do ponto.
+        latitude: latitude do ponto.
+
+    Retorna:
+        Nome do condado que contém o ponto, ou None se o ponto estiver fora de todos.
+    """
+    posicoes = indice_espacial_condados().query(
+        shapely.Point(longitude, latitude), predicate="within"
+    )
+    if len(posicoes) == 0:
+        return None
+    return gdf_geo["name"].iloc[posicoes[0]]
+
+
+@st.cache_data
+def lista_condados():
+    """
+    Lista os nomes dos condados disponíveis, em ordem alfabética.
+
+    Como 'name' é categórica, as categorias já são os nomes únicos e ordenados.
+
+    Retorna:
+        Lista de strings com os nomes dos condados.
+    """
+    return gdf_geo["name"].cat.categories.tolist()
 
 
-# Carregamento dos dados e modelo
+@st.cache_data
+def prever_precos_condados(housing_median_age, median_income):
+    """
+    Prevê, em lote, o preço dos imóveis de todos os condados.
+
+    Os atributos geográficos de cada condado são fixos; apenas a idade do imóvel e
+    a renda, informadas pelo usuário, mudam a entrada do modelo. Assim, uma única
+    chamada a predict cobre todos os condados, e o resultado fica em cache para
+    cada combinação de idade e renda.
+
+    Parâmetros:
+        housing_median_age: idade do imóvel.
+        median_income: renda média na escala do modelo (dezenas de milhares de US$).
+
+    Retorna:
+        Array com o preço previsto de cada condado, na ordem dos arrays de
+        carregar_atributos_condados.
+    """
+    # Categoriza renda nas faixas [0, 1.5, 3, 4.5, 6, inf), numeradas de 1 a 5;
+    # equivale a np.digitize para um único valor, sem a chamada ao NumPy
+    median_income_cat = (
+        1
+        + int(median_income >= 1.5)
+        + int(median_income >= 3)
+        + int(median_income >= 4.5)
+        + int(median_income >= 6)
+    )
+
+    # Colunas que dependem apenas das entradas do usuário
+    entradas_usuario = {
+        "housing_median_age": housing_median_age,
+        "median_income": median_income,
+        "median_income_cat": median_income_cat,
+    }
+
+    atributos, _ = carregar_atributos_condados()
+    colunas = colunas_modelo()
+
+    # Monta a entrada como array NumPy, uma linha por condado, na ordem das colunas
+    # do modelo (dtype object para manter o texto de ocean_proximity); os atributos
+    # geográficos são copiados coluna a coluna dos arrays de cada atributo
+    X_entrada = np.empty((len(atributos["name"]), len(colunas)), dtype=object)
+    for j, coluna in enumerate(colunas):
+        if coluna in entradas_usuario:
+            X_entrada[:, j] = entradas_usuario[coluna]
+        else:
+            X_entrada[:, j] = atributos[coluna]
+
+    # O ColumnTransformer seleciona colunas pelo nome, então o array é apenas
+    # envolvido em um DataFrame, sem cópia
+    df_entrada_modelo = pd.DataFrame(X_entrada, columns=colunas, copy=False)
+
+    precos = carregar_modelo().predict(df_entrada_modelo)
+    return np.ravel(precos)
+
+
+@st.cache_resource
+def camada_condados():
+    """
+    Cria a camada do mapa que exibe todos os condados.
+
+    A camada não muda entre execuções, então é criada uma única vez e
+    compartilhada; os dados já vão convertidos em lista de registros, evitando
+    que o pydeck converta o DataFrame a cada execução.
+
+    Retorna:
+        Camada PolygonLayer do pydeck.
+    """
+    return pdk.Layer(
+        "PolygonLayer",
+        data=gdf_geo[["name", "geometry_coords"]].to_dict(orient="records"),
+        get_polygon="geometry_coords",
+        get_fill_color=[0, 0, 255, 100],  # Azul translúcido
+        get_line_color=[255, 255, 255],   # Contorno branco
+        get_line_width=50,
+        pickable=True,
+        auto_highlight=True,
+    )
+
+
+@st.cache_resource
+def json_camada_condados():
+    """
+    Serializa, uma única vez, a camada do mapa que exibe todos os condados.
+
+    É de longe a maior parte do mapa; guardar o JSON pronto (e compacto, sem a
+    indentação usada pelo pydeck) evita refazer essa conversão a cada execução.
+
+    Retorna:
+        Texto JSON da camada, no formato gerado pelo pydeck.
+    """
+    spec = json.loads(pdk.Deck(layers=[camada_condados()]).to_json())
+    return json.dumps(spec["layers"][0], separators=(",", ":"))
+
+
+class MapaCondados(pdk.Deck):
+    """
+    Deck do pydeck que inclui a camada de todos os condados já serializada.
+
+    Apenas as camadas passadas em `layers` (o destaque do condado escolhido) são
+    serializadas a cada execução; o JSON da camada de condados, em cache, é
+    inserido como primeira camada do mapa.
+    """
+
+    _MARCADOR = "__camada_condados__"
+
+    def to_json(self):
+        spec = json.loads(super().to_json())
+        spec["layers"].insert(0, self._MARCADOR)
+        return json.dumps(spec, separators=(",", ":")).replace(
+            json.dumps(self._MARCADOR), json_camada_condados(), 1
+        )
+
+
+# Carregamento dos dados (o modelo só é carregado na primeira previsão, dentro de
+# prever_precos_condados, para não atrasar a primeira exibição da página)
 df = carregar_dados_limpos()
 gdf_geo = carregar_dados_geo()
-modelo = carregar_modelo()
 
 # Título da aplicação Streamlit
 st.title("Previsão de preços de imóveis")
 
 # Lista de condados disponíveis (ordenada)
-condados = sorted(gdf_geo["name"].unique())
+condados = lista_condados()
 
 # Divide a tela em duas colunas
 coluna1, coluna2 = st.columns(2)
@@ -103,23 +319,19 @@ with coluna1:
         # Caixa de seleção para escolher o condado
         selecionar_condado = st.selectbox("Condado", condados)
 
-        # Busca coordenadas do condado selecionado
-        longitude = gdf_geo.query("name == @selecionar_condado")["longitude"].values
-        latitude = gdf_geo.query("name == @selecionar_condado")["latitude"].values
+        # Busca a posição do condado selecionado nos arrays de atributos e, com
+        # ela, as coordenadas usadas para centralizar o mapa
+        atributos, posicoes = carregar_atributos_condados()
+        posicao = posicoes[selecionar_condado]
+        longitude, latitude = (
+            float(atributos[coluna][posicao]) for coluna in ("longitude", "latitude")
+        )
 
         # Input para idade do imóvel
         housing_median_age = st.number_input(
             "Idade do imóvel", value=10, min_value=1, max_value=50
         )
 
-        # Busca valores referentes ao condado selecionado
-        total_rooms = gdf_geo.query("name == @selecionar_condado")["total_rooms"].values
-        total_bedrooms = gdf_geo.query("name == @selecionar_condado")[
-            "total_bedrooms"
-        ].values
-        population = gdf_geo.query("name == @selecionar_condado")["population"].values
-        households = gdf_geo.query("name == @selecionar_condado")["households"].values
-
         # Slider para renda média
         median_income = st.slider(
             "Renda média (milhares de US$)", 5.0, 100.0, 45.0, 5.0
@@ -128,85 +340,35 @@ with coluna1:
         # Escala da renda
         median_income_scale = median_income / 10
 
-        # Proximidade ao oceano
-        ocean_proximity = gdf_geo.query("name == @selecionar_condado")[
-            "ocean_proximity"
-        ].values
-
-        # Categoriza renda em faixas
-        bins_income = [0, 1.5, 3, 4.5, 6, np.inf]
-        median_income_cat = np.digitize(median_income_scale, bins=bins_income)
-
-        # Outras variáveis derivadas
-        rooms_per_household = gdf_geo.query("name == @selecionar_condado")[
-            "rooms_per_household"
-        ].values
-        bedrooms_per_room = gdf_geo.query("name == @selecionar_condado")[
-            "bedrooms_per_room"
-        ].values
-        population_per_household = gdf_geo.query("name == @selecionar_condado")[
-            "population_per_household"
-        ].values
-
-        # Monta dicionário com dados de entrada para o modelo
-        entrada_modelo = {
-            "longitude": longitude,
-            "latitude": latitude,
-            "housing_median_age": housing_median_age,
-            "total_rooms": total_rooms,
-            "total_bedrooms": total_bedrooms,
-            "population": population,
-            "households": households,
-            "median_income": median_income_scale,
-            "ocean_proximity": ocean_proximity,
-            "median_income_cat": median_income_cat,
-            "rooms_per_household": rooms_per_household,
-            "bedrooms_per_room": bedrooms_per_room,
-            "population_per_household": population_per_household,
-        }
-
-        # Converte em DataFrame
-        df_entrada_modelo = pd.DataFrame(entrada_modelo)
-
         # Botão para submeter o formulário
         botao_previsao = st.form_submit_button("Prever preço")
 
-    # Se usuário clicar no botão, faz previsão com o modelo
+    # Se usuário clicar no botão, busca a previsão do condado entre as previsões
+    # em lote (o modelo só roda de novo se a idade ou a renda mudarem)
     if botao_previsao:
-        preco = modelo.predict(df_entrada_modelo)
-        st.metric(label="Preço previsto: (US$)", value=f"{preco[0][0]:.2f}")
+        precos = prever_precos_condados(housing_median_age, median_income_scale)
+        preco = precos[posicao]
+        st.metric(label="Preço previsto: (US$)", value=f"{preco:.2f}")
 
 with coluna2:
 
     # Define a visão inicial do mapa (latitude e longitude do condado escolhido)
     view_state = pdk.ViewState(
-        latitude=float(latitude[0]),  # Conversão para float padrão
-        longitude=float(longitude[0]),  # Conversão para float padrão
+        latitude=latitude,
+        longitude=longitude,
         zoom=5,
         min_zoom=5,
         max_zoom=15,
     )
 
-    # Camada para exibir todos os condados
-    polygon_layer = pdk.Layer(
-        "PolygonLayer",
-        data=gdf_geo[["name", "geometry"]],
-        get_polygon="geometry",
-        get_fill_color=[0, 0, 255, 100],  # Azul translúcido
-        get_line_color=[255, 255, 255],   # Contorno branco
-        get_line_width=50,
-        pickable=True,
-        auto_highlight=True,
-    )
-
     # Seleciona o condado escolhido pelo usuário
-    condado_selecionado = gdf_geo.query("name == @selecionar_condado")
+    condado_selecionado = gdf_geo.iloc[posicoes_condados()[selecionar_condado]]
 
     # Camada de destaque para o condado selecionado
     highlight_layer = pdk.Layer(
         "PolygonLayer",
-        data=condado_selecionado[["name", "geometry"]],
-        get_polygon="geometry",
+        data=condado_selecionado[["name", "geometry_coords"]],
+        get_polygon="geometry_coords",
         get_fill_color=[255, 0, 0, 100],  # Vermelho translúcido
         get_line_color=[0, 0, 0],         # Contorno preto
         get_line_width=500,
@@ -220,11 +382,12 @@ with coluna2:
         "style": {"backgroundColor": "steelblue", "color": "white", "fontsize": "10px"},
     }
 
-    # Criação do mapa interativo
-    mapa = pdk.Deck(
+    # Criação do mapa interativo (a camada com todos os condados, que não muda,
+    # entra já serializada; apenas o destaque é serializado a cada execução)
+    mapa = MapaCondados(
         initial_view_state=view_state,
         map_style="light",
-        layers=[polygon_layer, highlight_layer],
+        layers=[highlight_layer],
         tooltip=tooltip,
     )
 
@@ -10,9 +10,28 @@ DADOS_ORIGINAIS = PASTA_DADOS / "housing.csv.zip"
 DADOS_LIMPOS = PASTA_DADOS / "housing_clean.parquet"
 DADOS_GEO_ORIGINAIS = PASTA_DADOS / "california_counties.geojson"
 DADOS_GEO_MEDIAN = PASTA_DADOS / "gdf_counties.parquet"
+DADOS_GEO_RENDER = PASTA_DADOS / "gdf_counties_render.parquet"
+
+# colunas de DADOS_GEO_MEDIAN usadas pelo aplicativo, além das geometrias
+COLUNAS_GEO_APP = [
+    "name",
+    "longitude",
+    "latitude",
+    "total_rooms",
+    "total_bedrooms",
+    "population",
+    "households",
+    "ocean_proximity",
+    "rooms_per_household",
+    "bedrooms_per_room",
+    "population_per_household",
+]
 
 # coloque abaixo o caminho para os arquivos de modelos de seu projeto
 PASTA_MODELOS = PASTA_PROJETO / "modelos"
+# o aplicativo carrega o modelo final com joblib.load(..., mmap_mode="r"), o que só
+# funciona com arquivos sem compressão: salve-o com joblib.dump(modelo, MODELO_FINAL,
+# compress=0) (o padrão do joblib.dump)
 MODELO_FINAL = PASTA_MODELOS / "ridge_polyfeat_target_quantile.joblib"
 
 # coloque abaixo outros caminhos que você julgar necessário
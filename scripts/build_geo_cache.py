@@ -0,0 +1,99 @@
+"""
+Pré-processa as geometrias dos condados para o mapa do aplicativo (home.py).
+
+Lê o arquivo DADOS_GEO_MEDIAN, explode multipolígonos, corrige e orienta as
+geometrias e extrai as coordenadas dos anéis externos no formato esperado pelo
+PolygonLayer do pydeck. O resultado é salvo em DADOS_GEO_RENDER, que o aplicativo
+apenas lê, sem refazer esse processamento a cada inicialização.
+
+Execute a partir da raiz do projeto sempre que DADOS_GEO_MEDIAN for alterado:
+
+    python -m scripts.build_geo_cache
+"""
+
+import numpy as np        # Biblioteca para operações numéricas e vetoriais
+import pyarrow as pa      # Biblioteca para dados colunares (Apache Arrow)
+import pyarrow.parquet as pq  # Leitura e escrita de arquivos Parquet via Arrow
+import shapely            # Biblioteca para manipulação de geometrias espaciais
+
+# Importa variáveis de configuração (caminhos dos dados)
+from notebooks.src.config import COLUNAS_GEO_APP, DADOS_GEO_MEDIAN, DADOS_GEO_RENDER
+
+
+def processar_dados_geo():
+    """
+    Prepara os dados geoespaciais para visualização no pydeck.
+
+    Passos:
+    - Lê do arquivo parquet apenas as colunas usadas pelo aplicativo.
+    - Explode MultiPolygons em polígonos individuais.
+    - Corrige geometrias inválidas (make_valid).
+    - Orienta os anéis externos no sentido anti-horário.
+    - Extrai coordenadas dos polígonos para a coluna 'geometry_coords'.
+    - Converte os atributos numéricos para float32.
+
+    As etapas com geometrias usam as funções vetorizadas do shapely 2, que operam
+    sobre todo o array de geometrias em uma única chamada em C. O arquivo é lido
+    diretamente com pyarrow (as geometrias vêm em WKB), sem montar um GeoDataFrame.
+
+    Retorna:
+        Tabela do Arrow com os atributos dos condados e a coluna 'geometry_coords'
+        (lista de anéis, cada um uma lista de pares [x, y]).
+    """
+    tabela = pq.read_table(DADOS_GEO_MEDIAN, columns=[*COLUNAS_GEO_APP, "geometry"])
+    geometrias = shapely.from_wkb(
+        tabela.column("geometry").to_numpy(zero_copy_only=False)
+    )
+
+    # Divide multipolígonos em polígonos individuais, repetindo os atributos do
+    # condado em cada linha
+    geometrias, linhas = shapely.get_parts(geometrias, return_index=True)
+    df_geo = tabela.drop_columns("geometry").to_pandas()
+    df_geo = df_geo.iloc[linhas].reset_index(drop=True)
+
+    # Corrige geometrias inválidas (geometrias válidas são mantidas como estão)
+    geometrias = shapely.make_valid(geometrias)
+
+    # A correção pode gerar multipolígonos: separa as partes, guardando a linha de
+    # origem de cada uma, e descarta o que não for polígono
+    partes, linhas = shapely.get_parts(geometrias, return_index=True)
+    eh_poligono = shapely.get_type_id(partes) == shapely.GeometryType.POLYGON
+    partes, linhas = partes[eh_poligono], linhas[eh_poligono]
+
+    # Orienta os anéis externos no sentido anti-horário
+    aneis = shapely.get_exterior_ring(partes)
+    aneis = np.where(shapely.is_ccw(aneis), aneis, shapely.reverse(aneis))
+
+    # Extrai as coordenadas de todos os anéis de uma vez; offsets delimita cada anel
+    _, coords, (offsets, _) = shapely.to_ragged_array(shapely.polygons(aneis))
+
+    # Monta a lista aninhada do Arrow (linha -> anéis -> pontos -> [x, y]) direto
+    # dos offsets, sem criar listas Python; como as partes saem na ordem das linhas,
+    # a contagem acumulada de anéis por linha dá os offsets do nível mais externo
+    aneis_por_linha = np.bincount(linhas, minlength=len(df_geo))
+    pontos = pa.ListArray.from_arrays(
+        np.arange(0, coords.size + 1, 2, dtype=np.int32), coords.ravel()
+    )
+    coords_aneis = pa.ListArray.from_arrays(offsets.astype(np.int32), pontos)
+    geometry_coords = pa.ListArray.from_arrays(
+        np.r_[0, np.cumsum(aneis_por_linha)].astype(np.int32), coords_aneis
+    )
+
+    # Os atributos têm poucos dígitos significativos: float32 basta e ocupa metade
+    # da memória (as coordenadas dos polígonos continuam em float64)
+    numericas = df_geo.select_dtypes("number").columns
+    df_geo[numericas] = df_geo[numericas].astype("float32")
+
+    return pa.Table.from_pandas(df_geo, preserve_index=False).append_column(
+        "geometry_coords", geometry_coords
+    )
+
+
+def main():
+    tabela_geo = processar_dados_geo()
+    pq.write_table(tabela_geo, DADOS_GEO_RENDER)
+    print(f"{tabela_geo.num_rows} polígonos salvos em {DADOS_GEO_RENDER}")
+
+
+if __name__ == "__main__":
+    main()